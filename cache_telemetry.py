@@ -0,0 +1,110 @@
+# cache_telemetry.py
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Approximate list prices in USD per 1M prompt tokens: (uncached, cached). Matched by longest prefix.
+MODEL_PROMPT_PRICES = {
+    "gpt-3.5-turbo": (0.50, 0.50), # No provider prompt caching
+    "gpt-4": (30.00, 30.00),
+    "gpt-4-turbo": (10.00, 10.00),
+    "gpt-4o": (2.50, 1.25),
+    "gpt-4o-mini": (0.15, 0.075),
+    "gpt-4.1": (2.00, 0.50),
+    "gpt-4.1-mini": (0.40, 0.10),
+}
+
+
+def _prompt_prices(model: str) -> tuple[float, float] | None:
+    """Returns the (uncached, cached) prompt price of model, or None if it is unknown."""
+    matches = [name for name in MODEL_PROMPT_PRICES if model.startswith(name)]
+    return MODEL_PROMPT_PRICES[max(matches, key=len)] if matches else None
+
+
+def _read_usage(usage) -> tuple[int, int]:
+    """Returns (prompt_tokens, cached_tokens) from an SDK usage object or a raw usage dict."""
+    if isinstance(usage, dict):
+        details = usage.get("prompt_tokens_details") or {}
+        return usage.get("prompt_tokens") or 0, details.get("cached_tokens") or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(usage, "prompt_tokens", 0) or 0, getattr(details, "cached_tokens", None) or 0
+
+
+class CacheTelemetry:
+    """Tracks how often the provider's prompt prefix cache is hit and what it saves."""
+
+    def __init__(self):
+        """Initializes the CacheTelemetry with empty totals."""
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.saved_usd = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of all recorded prompt tokens that were served from the provider cache."""
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def record(self, model: str, usage) -> None:
+        """
+        Records the usage of one completion and logs its cache hit rate and savings.
+
+        Args:
+            model: The model that served the call (used to look up prices).
+            usage: The response's usage, as an SDK object or a raw dict.
+        """
+        prompt_tokens, cached_tokens = _read_usage(usage)
+        prices = _prompt_prices(model)
+        saved = cached_tokens * (prices[0] - prices[1]) / 1_000_000 if prices else 0.0
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        self.saved_usd += saved
+        hit_rate = cached_tokens / prompt_tokens if prompt_tokens else 0.0
+        logging.info(f"Prompt cache: {'HIT' if cached_tokens else 'MISS'} | {hit_rate:.1%} of {prompt_tokens} tokens cached | "
+                     f"Saved ${saved:.4f} (session: {self.hit_rate:.1%}, ${self.saved_usd:.4f})")
+
+    def summary(self) -> str:
+        """Returns a one-line summary of all recorded calls."""
+        return (f"{self.calls} calls, {self.cached_tokens}/{self.prompt_tokens} prompt tokens cached "
+                f"({self.hit_rate:.1%}), saved ${self.saved_usd:.4f}")
+
+
+class _TelemetryCompletions:
+    """Proxy for client.chat.completions that records usage after every create()."""
+
+    def __init__(self, completions, telemetry: CacheTelemetry):
+        self._completions = completions
+        self._telemetry = telemetry
+
+    async def create(self, **kwargs):
+        response = await self._completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._watch_stream(response, kwargs.get("model", ""))
+        if response.usage:
+            self._telemetry.record(kwargs.get("model", ""), response.usage)
+        return response
+
+    async def _watch_stream(self, stream, model: str):
+        # Usage arrives on the final chunk when stream_options={"include_usage": True}
+        async for chunk in stream:
+            if chunk.usage:
+                self._telemetry.record(model, chunk.usage)
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+
+def wrap(completions, telemetry: CacheTelemetry):
+    """
+    Wraps an OpenAI client's chat.completions so every call reports cache telemetry.
+
+    Args:
+        completions: The client's chat.completions resource.
+        telemetry: Where usage is recorded.
+
+    Returns:
+        A drop-in replacement exposing the same create() interface.
+    """
+    return _TelemetryCompletions(completions, telemetry)
@@ -1,34 +1,364 @@
 # chatbot.py
 import os
+import asyncio
 import logging
+import random
+from collections.abc import AsyncIterator, Callable
+from functools import lru_cache
+import httpx
 import openai
-from openai import OpenAI, RateLimitError, APIError
-import time
+import tiktoken
+from openai import AsyncOpenAI, RateLimitError, APIError
 from dotenv import load_dotenv
+try:
+    import aiohttp # Optional: only needed for Chatbot(use_aiohttp=True)
+except ImportError:
+    aiohttp = None
+try:
+    import orjson # Optional: several times faster than json for request payloads
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+from response_cache import ResponseCache, SemanticResponseCache, get_default_cache, make_cache_key
+import cache_telemetry
+from cache_telemetry import CacheTelemetry
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 load_dotenv() # Load environment variables from .env file
 
+CACHEABLE_MAX_TEMPERATURE = 0.3 # Responses above this temperature are too random to reuse
+EMBEDDING_MODEL = "text-embedding-3-small" # Used to match paraphrased prompts in the semantic cache
+MAX_CONNECTIONS = 100 # Concurrent requests allowed; httpx's small default pool throttles asyncio.gather
+MAX_KEEPALIVE_CONNECTIONS = 50
+KEEPALIVE_EXPIRY = 60.0 # Seconds an idle connection stays warm for reuse
+HTTP_TIMEOUT = 60.0
+AIOHTTP_CONNECTION_LIMIT = 200
+AIOHTTP_CONNECTION_LIMIT_PER_HOST = 100
+AIOHTTP_DNS_CACHE_TTL = 300 # Seconds
+MAX_RETRY_DELAY = 60.0 # Cap for exponential backoff between retries, in seconds
+RETRYABLE_ERRORS = (RateLimitError, openai.InternalServerError, openai.APIConnectionError) # Other 4xx fail at once
+BATCH_MAX_RETRIES = 2 # SDK retries for Batch API file and status calls, which have no retry loop of their own
+BATCH_POLL_INTERVAL = 60 # Seconds between status checks of an offline Batch API job
+BATCH_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+CONTEXT_RESERVE_TOKENS = 1024 # Room left in the context window for the response
+MODEL_CONTEXT_WINDOWS = { # Matched by longest prefix, so dated snapshots (e.g. "gpt-4o-2024-08-06") resolve too
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-1106-preview": 128000, # 128k previews that would otherwise match "gpt-4"
+    "gpt-4-0125-preview": 128000,
+    "gpt-4-vision-preview": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4.1": 1047576,
+}
+
+
+class ContextOverflowError(ValueError):
+    """Raised when a prompt cannot fit in the model's context window."""
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """Returns the tokenizer for model, falling back to cl100k_base for unknown models."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def _context_window(model: str) -> int | None:
+    """Returns the context window of model in tokens, or None if it is unknown."""
+    matches = [name for name in MODEL_CONTEXT_WINDOWS if model.startswith(name)]
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)] if matches else None
+
+
+def _create_shared_http_client() -> httpx.AsyncClient:
+    """Creates the connection pool shared by every Chatbot, preferring HTTP/2 when 'h2' is installed."""
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS,
+                          max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                          keepalive_expiry=KEEPALIVE_EXPIRY)
+    try:
+        return httpx.AsyncClient(http2=True, limits=limits, timeout=HTTP_TIMEOUT)
+    except ImportError:
+        logging.warning("HTTP/2 support not installed (pip install 'httpx[http2]'). Falling back to HTTP/1.1.")
+        return httpx.AsyncClient(limits=limits, timeout=HTTP_TIMEOUT)
+
+
+# One pool for all Chatbot instances so calls reuse warm TLS connections. Pools are bound to the
+# event loop that opened their connections, so each is created lazily and replaced on a new loop.
+_shared_http = None
+_shared_http_loop = None
+
+
+def _get_shared_http_client() -> httpx.AsyncClient:
+    """Returns the httpx pool for the running event loop, creating it on first use in that loop."""
+    global _shared_http, _shared_http_loop
+    loop = asyncio.get_running_loop()
+    if _shared_http is None or _shared_http.is_closed or _shared_http_loop is not loop:
+        _shared_http = _create_shared_http_client()
+        _shared_http_loop = loop
+    return _shared_http
+
+
+def _retry_delay(error: Exception, attempt: int, base_delay: float) -> float:
+    """
+    Picks how long to wait before retrying a failed call.
+
+    Honors the server's Retry-After guidance when present, otherwise uses
+    capped exponential backoff with jitter to avoid synchronized retries.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            retry_after = float(headers.get(header, 0)) * scale
+        except (TypeError, ValueError): # e.g. an HTTP-date instead of seconds
+            continue
+        if retry_after > 0:
+            return min(MAX_RETRY_DELAY, retry_after)
+    return min(MAX_RETRY_DELAY, base_delay * 2 ** attempt) + random.uniform(0, base_delay)
+
+
+# Created lazily because an aiohttp session must be opened inside a running event loop
+_aiohttp_session = None
+_aiohttp_session_loop = None
+
+
+def _get_aiohttp_session() -> "aiohttp.ClientSession":
+    """Returns the aiohttp session shared by every Chatbot using the direct REST path in the running loop."""
+    global _aiohttp_session, _aiohttp_session_loop
+    loop = asyncio.get_running_loop()
+    if _aiohttp_session is None or _aiohttp_session.closed or _aiohttp_session_loop is not loop:
+        _aiohttp_session_loop = loop
+        connector = aiohttp.TCPConnector(limit=AIOHTTP_CONNECTION_LIMIT,
+                                         limit_per_host=AIOHTTP_CONNECTION_LIMIT_PER_HOST,
+                                         ttl_dns_cache=AIOHTTP_DNS_CACHE_TTL)
+        _aiohttp_session = aiohttp.ClientSession(connector=connector,
+                                                 timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT))
+    return _aiohttp_session
+
+
+def _parse_error_body(body: bytes):
+    """Returns an error response body as parsed JSON, or as text if it is not JSON."""
+    if not body:
+        return None
+    try:
+        return _json_loads(body)
+    except ValueError:
+        return body.decode("utf-8", errors="replace")
+
+
+async def close_shared_http_client():
+    """
+    Closes the shared connection pools of the running event loop.
+
+    Await once all Chatbot work in the loop is done. Later calls, in this or
+    another loop, open fresh pools.
+    """
+    global _shared_http, _shared_http_loop, _aiohttp_session, _aiohttp_session_loop
+    loop = asyncio.get_running_loop()
+    if _shared_http is not None and _shared_http_loop is loop:
+        await _shared_http.aclose()
+    _shared_http = _shared_http_loop = None
+    if _aiohttp_session is not None and _aiohttp_session_loop is loop and not _aiohttp_session.closed:
+        await _aiohttp_session.close()
+    _aiohttp_session = _aiohttp_session_loop = None
+
+
 class Chatbot:
     """A chatbot class to interact with OpenAI's API."""
 
-    def __init__(self, model: str = "gpt-3.5-turbo", temperature: float = 0.5):
+    def __init__(self, model: str = "gpt-3.5-turbo", temperature: float = 0.5, cache: ResponseCache | None = None,
+                 semantic_cache: SemanticResponseCache | None = None, use_aiohttp: bool = False,
+                 telemetry: CacheTelemetry | None = None):
         """
         Initializes the Chatbot.
 
         Args:
             model: The OpenAI model to use (e.g., "gpt-3.5-turbo", "gpt-4").
             temperature: Controls randomness (0.0 to 1.0). Lower is more deterministic.
+            cache: Exact-match response cache. Defaults to the process-wide on-disk cache (see get_default_cache).
+            semantic_cache: Optional embedding-based cache consulted after an exact-match miss.
+            use_aiohttp: Send chat completions as direct aiohttp POSTs instead of through the SDK's
+                         httpx layer, which scales better under many concurrent requests.
+            telemetry: Records provider prompt-cache hits; pass one instance to several bots to pool stats.
         """
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set.")
-        self.client = OpenAI(api_key=api_key)
+        self._api_key = api_key
+        self._client = None
+        self._client_http = None
+        self.telemetry = telemetry if telemetry is not None else CacheTelemetry()
+        if use_aiohttp and aiohttp is None:
+            logging.warning("aiohttp is not installed (pip install aiohttp). Falling back to the OpenAI SDK.")
+            use_aiohttp = False
+        self.use_aiohttp = use_aiohttp
         self.model = model
         self.temperature = temperature
+        self.cache = cache if cache is not None else get_default_cache()
+        self.semantic_cache = semantic_cache
         logging.info(f"Chatbot initialized with model: {self.model}")
 
-    def _call_llm(self, system_prompt: str, user_prompt: str, max_retries: int = 3, delay: int = 5) -> str | None:
+    def _ensure_client(self) -> AsyncOpenAI:
+        """Binds the SDK client to the running loop's shared connection pool, rebuilding it when the pool changes."""
+        http_client = _get_shared_http_client()
+        if self._client is None or self._client_http is not http_client:
+            # The SDK's own retries would multiply with _call_llm's; _retry_delay is the only retry policy
+            self._client = AsyncOpenAI(api_key=self._api_key, http_client=http_client, max_retries=0)
+            self._client_http = http_client
+            self._completions_proxy = cache_telemetry.wrap(self._client.chat.completions, self.telemetry)
+        return self._client
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """The SDK client for the running event loop."""
+        return self._ensure_client()
+
+    @property
+    def _completions(self):
+        """The running loop's client.chat.completions, wrapped with prompt-cache telemetry."""
+        self._ensure_client()
+        return self._completions_proxy
+
+    async def _embed(self, text: str) -> list[float] | None:
+        """
+        Embeds text for semantic cache lookups.
+
+        Returns:
+            The embedding vector or None if the embedding call failed.
+        """
+        try:
+            response = await self.client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+            return response.data[0].embedding
+        except Exception as e:
+            logging.warning(f"Embedding call failed, skipping semantic cache: {e}")
+            return None
+
+    def _check_context_budget(self, system_prompt: str, user_prompt: str):
+        """
+        Counts prompt tokens locally so oversized prompts fail fast instead of after a round-trip.
+
+        Raises:
+            ContextOverflowError: If the prompt leaves less than CONTEXT_RESERVE_TOKENS for the response.
+        """
+        context_window = _context_window(self.model)
+        if context_window is None:
+            return
+        encoding = get_encoding(self.model)
+        n_tokens = (len(encoding.encode(system_prompt, disallowed_special=()))
+                    + len(encoding.encode(user_prompt, disallowed_special=())))
+        budget = context_window - CONTEXT_RESERVE_TOKENS
+        if n_tokens > budget:
+            raise ContextOverflowError(f"Prompt has {n_tokens} tokens; {self.model} allows {budget} "
+                                       f"(leaving {CONTEXT_RESERVE_TOKENS} for the response).")
+
+    async def _sdk_completion(self, messages: list[dict]) -> str | None:
+        """
+        Requests a chat completion through the OpenAI SDK.
+
+        Returns:
+            The raw message content or None if the response was empty.
+        """
+        response = await self._completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+        )
+        # Ensure response.choices is not empty and has a message
+        if response.choices and response.choices[0].message:
+            return response.choices[0].message.content
+        logging.warning("LLM response structure unexpected or empty.")
+        return None
+
+    async def _aiohttp_completion(self, messages: list[dict]) -> str | None:
+        """
+        Requests a chat completion with a direct POST on the shared aiohttp session.
+
+        HTTP and connection failures are raised as the SDK's exception types so
+        the retry logic in _call_llm treats both paths the same way.
+
+        Returns:
+            The raw message content or None if the response was empty.
+        """
+        url = f"{self.client.base_url}chat/completions"
+        payload = {"model": self.model, "messages": messages, "temperature": self.temperature}
+        try:
+            async with _get_aiohttp_session().post(
+                url, data=_json_dumps(payload),
+                headers={"Authorization": f"Bearer {self._api_key}", "Content-Type": "application/json"}
+            ) as resp:
+                body = await resp.read()
+                status, headers = resp.status, dict(resp.headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise openai.APIConnectionError(message=str(e), request=httpx.Request("POST", url)) from e
+
+        if status >= 400:
+            response = httpx.Response(status, headers=headers, content=body, request=httpx.Request("POST", url))
+            data = _parse_error_body(body)
+            error = data.get("error") if isinstance(data, dict) else None
+            if isinstance(error, dict):
+                error = error.get("message")
+            message = error if isinstance(error, str) and error else f"HTTP {status}"
+            if status == 429:
+                raise openai.RateLimitError(message, response=response, body=data)
+            if status >= 500:
+                raise openai.InternalServerError(message, response=response, body=data)
+            raise openai.APIStatusError(message, response=response, body=data)
+
+        try:
+            data = _json_loads(body)
+        except ValueError:
+            logging.warning("LLM response was not valid JSON.")
+            return None
+        if not isinstance(data, dict):
+            logging.warning("LLM response structure unexpected or empty.")
+            return None
+        if data.get("usage"):
+            self.telemetry.record(self.model, data["usage"])
+        try:
+            return data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            logging.warning("LLM response structure unexpected or empty.")
+            return None
+
+    def _cache_key_for(self, system_prompt: str, user_prompt: str) -> str | None:
+        """Returns the exact-match cache key for a prompt pair, or None if this bot's responses are not cached."""
+        if self.temperature > CACHEABLE_MAX_TEMPERATURE:
+            return None
+        return make_cache_key(self.model, self.temperature, system_prompt, user_prompt)
+
+    def is_cached(self, system_prompt: str, user_prompt: str) -> bool:
+        """Returns True if the exact-match cache already holds a response for this prompt pair."""
+        cache_key = self._cache_key_for(system_prompt, user_prompt)
+        return cache_key is not None and self.cache.get(cache_key) is not None
+
+    async def _store_response(self, cache_key: str | None, content: str,
+                              semantic_namespace: str | None = None, embedding: list[float] | None = None):
+        """
+        Writes a response to the caches that apply to it.
+
+        Cache failures (e.g. a locked database shared with another process) are only
+        logged, so a completion that was already paid for is never thrown away.
+        """
+        if cache_key:
+            try:
+                self.cache.set(cache_key, content)
+            except Exception as e:
+                logging.warning(f"Failed to write the response cache: {e}")
+        if embedding is not None:
+            try:
+                await asyncio.to_thread(self.semantic_cache.set, semantic_namespace, embedding, content)
+            except Exception as e:
+                logging.warning(f"Failed to write the semantic cache: {e}")
+
+    async def _call_llm(self, system_prompt: str, user_prompt: str, max_retries: int = 3, delay: float = 1.0) -> str | None:
         """
         Makes a call to the OpenAI API with retry logic.
 
@@ -36,66 +366,317 @@ class Chatbot:
             system_prompt: The role or context for the AI.
             user_prompt: The specific instruction or question for the AI.
             max_retries: Maximum number of retry attempts for rate limits/server errors.
-            delay: Delay in seconds between retries.
+            delay: Base delay in seconds for exponential backoff between retries.
 
         Returns:
             The AI's response content or None if an error persists.
+
+        Raises:
+            ContextOverflowError: If the prompt does not fit the model's context window.
         """
+        cache_key = None
+        semantic_namespace = embedding = None
+        if self.temperature <= CACHEABLE_MAX_TEMPERATURE:
+            cache_key = make_cache_key(self.model, self.temperature, system_prompt, user_prompt)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logging.info("LLM response served from cache.")
+                return cached
+
+        # Fail before any network call, including the embedding request of a semantic lookup
+        self._check_context_budget(system_prompt, user_prompt)
+        if cache_key and self.semantic_cache is not None:
+            # Only prompts sharing model, temperature and role are interchangeable
+            semantic_namespace = make_cache_key(self.model, self.temperature, system_prompt, "")
+            embedding = await self._embed(user_prompt)
+            if embedding is not None:
+                # The similarity scan runs off the event loop so concurrent calls are not blocked
+                try:
+                    cached = await asyncio.to_thread(self.semantic_cache.get, semantic_namespace, embedding)
+                except Exception as e:
+                    logging.warning(f"Semantic cache lookup failed, calling the LLM: {e}")
+                    cached = embedding = None
+                if cached is not None:
+                    logging.info("LLM response served from semantic cache.")
+                    await self._store_response(cache_key, cached)
+                    return cached
+
         attempt = 0
+        content = None
         while attempt < max_retries:
             try:
                 logging.info(f"Calling LLM (Attempt {attempt + 1}/{max_retries})...")
-                response = self.client.chat.completions.create(
+                messages = [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ]
+                if self.use_aiohttp:
+                    content = await self._aiohttp_completion(messages)
+                else:
+                    content = await self._sdk_completion(messages)
+                if content:
+                    logging.info("LLM call successful.")
+                    break
+                else:
+                    logging.warning("LLM returned an empty message.")
+                    return None # Or handle as appropriate
+
+            except RateLimitError as e:
+                wait = _retry_delay(e, attempt, delay)
+                logging.warning(f"Rate limit exceeded. Retrying in {wait:.1f}s... (Attempt {attempt + 1}/{max_retries})")
+                attempt += 1
+                if attempt < max_retries:
+                    await asyncio.sleep(wait)
+            except RETRYABLE_ERRORS as e:
+                wait = _retry_delay(e, attempt, delay)
+                logging.warning(f"API error occurred: {e}. Retrying in {wait:.1f}s... (Attempt {attempt + 1}/{max_retries})")
+                attempt += 1
+                if attempt < max_retries:
+                    await asyncio.sleep(wait)
+            except APIError as e:
+                logging.error(f"LLM call failed with a non-retryable API error: {e}")
+                return None
+            except Exception as e:
+                logging.error(f"An unexpected error occurred during LLM call: {e}")
+                return None # Non-retryable error or final attempt failed
+
+        if content is None:
+            logging.error("LLM call failed after multiple retries.")
+            return None
+
+        # Outside the retry handling so a cache failure cannot discard the completion
+        content = content.strip()
+        await self._store_response(cache_key, content, semantic_namespace, embedding)
+        return content
+
+    async def _stream_llm(self, system_prompt: str, user_prompt: str, max_retries: int = 3,
+                          delay: float = 1.0) -> AsyncIterator[str]:
+        """
+        Streams the AI's response token by token as it is generated.
+
+        Cache hits are yielded as a single piece. Rate limits, server errors and connection
+        errors are retried like in _call_llm until the first token arrives; after that the
+        caller has already consumed part of the response, so the error is raised.
+
+        Args:
+            system_prompt: The role or context for the AI.
+            user_prompt: The specific instruction or question for the AI.
+            max_retries: Maximum number of attempts before the first token arrives.
+            delay: Base delay in seconds for exponential backoff between retries.
+
+        Yields:
+            Pieces of the response content, in order.
+
+        Raises:
+            ContextOverflowError: If the prompt does not fit the model's context window.
+            Exception: Whatever error ended the stream; the pieces yielded so far are incomplete.
+        """
+        cache_key = None
+        if self.temperature <= CACHEABLE_MAX_TEMPERATURE:
+            cache_key = make_cache_key(self.model, self.temperature, system_prompt, user_prompt)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logging.info("LLM response served from cache.")
+                yield cached
+                return
+
+        self._check_context_budget(system_prompt, user_prompt)
+        pieces = []
+        attempt = 0
+        while True:
+            try:
+                logging.info(f"Calling LLM (streaming, Attempt {attempt + 1}/{max_retries})...")
+                stream = await self._completions.create(
                     model=self.model,
                     messages=[
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": user_prompt}
                     ],
                     temperature=self.temperature,
+                    stream=True,
+                    stream_options={"include_usage": True},
                 )
-                # Ensure response.choices is not empty and has a message
-                if response.choices and response.choices[0].message:
-                     content = response.choices[0].message.content
-                     if content:
-                        logging.info("LLM call successful.")
-                        return content.strip()
-                     else:
-                        logging.warning("LLM returned an empty message.")
-                        return None # Or handle as appropriate
-                else:
-                     logging.warning("LLM response structure unexpected or empty.")
-                     return None # Or handle appropriately
-
-            except RateLimitError as e:
-                logging.warning(f"Rate limit exceeded. Retrying in {delay}s... (Attempt {attempt + 1}/{max_retries})")
-                time.sleep(delay)
-                attempt += 1
-            except APIError as e:
-                logging.warning(f"API error occurred: {e}. Retrying in {delay}s... (Attempt {attempt + 1}/{max_retries})")
-                time.sleep(delay)
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        pieces.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+                break
+            except RETRYABLE_ERRORS as e:
                 attempt += 1
+                if pieces or attempt >= max_retries:
+                    logging.error(f"Streaming LLM call failed: {e}")
+                    raise
+                wait = _retry_delay(e, attempt - 1, delay)
+                logging.warning(f"API error occurred: {e}. Retrying in {wait:.1f}s... (Attempt {attempt}/{max_retries})")
+                await asyncio.sleep(wait)
             except Exception as e:
-                logging.error(f"An unexpected error occurred during LLM call: {e}")
-                return None # Non-retryable error or final attempt failed
+                logging.error(f"An unexpected error occurred during streaming LLM call: {e}")
+                raise
 
-        logging.error("LLM call failed after multiple retries.")
-        return None
+        content = "".join(pieces).strip()
+        if content:
+            logging.info("LLM call successful.")
+            await self._store_response(cache_key, content)
+        else:
+            logging.warning("LLM returned an empty message.")
 
-    def execute_task(self, role_prompt: str, task_prompt: str) -> str | None:
+    async def execute_task(self, role_prompt: str, task_prompt: str,
+                           on_token: Callable[[str], None] | None = None) -> str | None:
         """
         Executes a specific task by calling the LLM.
 
         Args:
             role_prompt: The system message defining the bot's role.
             task_prompt: The user message defining the specific task.
+            on_token: If given, the response is streamed and each piece is passed to
+                      this callback as it arrives (e.g., to print progress live).
 
         Returns:
-            The result from the LLM or None if an error occurred.
+            The result from the LLM or None if an error occurred. A stream that fails
+            partway also returns None, even though on_token already saw some pieces.
+
+        Raises:
+            ContextOverflowError: If the prompt does not fit the model's context window.
         """
         logging.info(f"Executing task with role: {role_prompt[:100]}...") # Log snippet
-        return self._call_llm(system_prompt=role_prompt, user_prompt=task_prompt)
+        if on_token is None:
+            return await self._call_llm(system_prompt=role_prompt, user_prompt=task_prompt)
+        pieces = []
+        try:
+            async for piece in self._stream_llm(system_prompt=role_prompt, user_prompt=task_prompt):
+                on_token(piece)
+                pieces.append(piece)
+        except ContextOverflowError:
+            raise
+        except Exception:
+            if pieces:
+                logging.error("Stream was interrupted; discarding the partial response.")
+            return None
+        return "".join(pieces).strip() or None
 
-if __name__ == '__main__':
+    async def submit_batch(self, requests: list[dict]) -> str | None:
+        """
+        Submits chat completions to the OpenAI Batch API (half price, completed within 24h).
+
+        Args:
+            requests: Dicts with "custom_id", "system_prompt" and "user_prompt" keys.
+
+        Returns:
+            The batch ID or None if the submission failed.
+        """
+        lines = [
+            _json_dumps({
+                "custom_id": str(request["custom_id"]),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": [
+                        {"role": "system", "content": request["system_prompt"]},
+                        {"role": "user", "content": request["user_prompt"]}
+                    ],
+                    "temperature": self.temperature,
+                },
+            })
+            for request in requests
+        ]
+        client = self.client.with_options(max_retries=BATCH_MAX_RETRIES)
+        try:
+            batch_file = await client.files.create(
+                file=("batch.jsonl", b"\n".join(lines)), purpose="batch"
+            )
+            batch = await client.batches.create(
+                input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window="24h"
+            )
+        except Exception as e:
+            logging.error(f"Failed to submit batch: {e}")
+            return None
+        logging.info(f"Submitted batch {batch.id} with {len(requests)} requests.")
+        return batch.id
+
+    async def wait_for_batch(self, batch_id: str, poll_interval: float = BATCH_POLL_INTERVAL) -> dict[str, str | None] | None:
+        """
+        Polls a batch until it finishes and collects its results.
+
+        Args:
+            batch_id: The ID returned by submit_batch.
+            poll_interval: Seconds between status checks.
+
+        Returns:
+            A mapping of custom_id to response content (None for failed requests),
+            or None if the batch itself did not complete.
+        """
+        client = self.client.with_options(max_retries=BATCH_MAX_RETRIES)
+        try:
+            batch = await client.batches.retrieve(batch_id)
+            while batch.status not in BATCH_TERMINAL_STATUSES:
+                logging.info(f"Batch {batch_id} is {batch.status}. Checking again in {poll_interval}s...")
+                await asyncio.sleep(poll_interval)
+                batch = await client.batches.retrieve(batch_id)
+            if batch.status != "completed" or not batch.output_file_id:
+                logging.error(f"Batch {batch_id} ended with status: {batch.status}")
+                return None
+            output = await client.files.content(batch.output_file_id)
+        except Exception as e:
+            logging.error(f"Failed to retrieve batch {batch_id}: {e}")
+            return None
+
+        results = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = _json_loads(line)
+            response = record.get("response") or {}
+            try:
+                content = response["body"]["choices"][0]["message"]["content"]
+                results[record["custom_id"]] = content.strip() if content else None
+            except (KeyError, IndexError, TypeError):
+                logging.warning(f"Batch request {record.get('custom_id')} failed: {record.get('error')}")
+                results[record["custom_id"]] = None
+        logging.info(f"Batch {batch_id} completed with {len(results)} results.")
+        return results
+
+    async def run_batch(self, requests: list[dict], poll_interval: float = BATCH_POLL_INTERVAL) -> dict[str, str | None] | None:
+        """
+        Submits requests as one batch and waits for the results.
+
+        Requests already in the exact-match cache are answered locally and only the
+        misses are submitted; their results are cached like realtime responses.
+
+        Returns:
+            A mapping of custom_id to response content, or None if the batch failed.
+        """
+        results, misses = {}, []
+        for request in requests:
+            cache_key = self._cache_key_for(request["system_prompt"], request["user_prompt"])
+            cached = self.cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                results[str(request["custom_id"])] = cached
+            else:
+                misses.append((request, cache_key))
+        if results:
+            logging.info(f"{len(results)}/{len(requests)} batch requests served from cache.")
+        if not misses:
+            return results
+
+        batch_id = await self.submit_batch([request for request, _ in misses])
+        if not batch_id:
+            return None
+        batch_results = await self.wait_for_batch(batch_id, poll_interval)
+        if batch_results is None:
+            return None
+        for request, cache_key in misses:
+            content = batch_results.get(str(request["custom_id"]))
+            if content:
+                await self._store_response(cache_key, content)
+        results.update(batch_results)
+        return results
+
+def _print_token(token: str):
+    """Prints a streamed piece of a response without a trailing newline."""
+    print(token, end="", flush=True)
+
+async def _demo():
     # Example usage (requires .env file with API key)
     try:
         bot = Chatbot(model="gpt-3.5-turbo") # Use "gpt-4" for potentially better results if available
@@ -123,11 +704,10 @@ if __name__ == '__main__':
         ---
         Provide the extracted information clearly labeled.
         """
-        extraction_result = bot.execute_task(extractor_role, extraction_task)
         print("\n--- Extraction Bot Test ---")
-        if extraction_result:
-            print(extraction_result)
-        else:
+        extraction_result = await bot.execute_task(extractor_role, extraction_task, on_token=_print_token)
+        print()
+        if not extraction_result:
             print("Extraction task failed.")
 
         # --- Test Synthesis Task ---
@@ -150,14 +730,18 @@ if __name__ == '__main__':
 
         Produce the final synthesized digest.
         """
-        synthesis_result = bot.execute_task(synthesizer_role, synthesis_task)
         print("\n--- Synthesizer Bot Test ---")
-        if synthesis_result:
-            print(synthesis_result)
-        else:
+        synthesis_result = await bot.execute_task(synthesizer_role, synthesis_task, on_token=_print_token)
+        print()
+        if not synthesis_result:
             print("Synthesis task failed.")
 
     except ValueError as e:
         print(f"Error: {e}")
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
\ No newline at end of file
+        print(f"An unexpected error occurred: {e}")
+    finally:
+        await close_shared_http_client()
+
+if __name__ == '__main__':
+    asyncio.run(_demo())
\ No newline at end of file
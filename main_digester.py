@@ -1,116 +1,538 @@
 # main_digester.py
 import os
+import asyncio
+import hashlib
 import logging
+import string
+import tiktoken
+from collections import Counter
+from collections.abc import Callable
 from pdf_processor import extract_text_from_pdf
-from chatbot import Chatbot
+from chatbot import Chatbot, ContextOverflowError, close_shared_http_client, get_encoding
+from cache_telemetry import CacheTelemetry
+from response_cache import SemanticResponseCache
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # --- Configuration ---
 PDF_PATH = "Recommender_Systems.pdf"  # <--- IMPORTANT: SET THIS TO YOUR PDF FILE
 LLM_MODEL = "gpt-3.5-turbo" # Or "gpt-4", "gpt-4-turbo", etc.
-MAX_TEXT_LENGTH_WARN = 50000 # Warn if extracted text is very long (potential context issues)
+MAX_TEXT_LENGTH_WARN = 50000 # Warn if extracted text is very long (many chunks, slow/expensive)
+CHUNK_MAX_TOKENS = 3000 # Token budget for the paper text sent in one extractor call
+SPLIT_SEPARATORS = ("\n\n", "\n", ". ", " ") # Tried in order when a single page exceeds the budget
 # --- End Configuration ---
 
+# --- Prompts ---
+# All static instructions live in the system prompts and the paper text goes last in the
+# user message, so every call shares the longest possible prefix for provider prompt caching.
+EXTRACTOR_SYSTEM_PROMPT = """You are an AI assistant specialized in extracting key structured information from academic research papers. Focus on accuracy and conciseness.
 
-def run_digestion_pipeline(pdf_path: str):
+You will be given one excerpt of a longer research paper. Carefully read it and extract the following sections clearly and concisely:
+1.  **Core Problem:** What specific problem or question does the paper address?
+2.  **Proposed Method/Solution:** Briefly describe the key technique, model, or approach proposed.
+3.  **Key Results:** What were the main quantitative or qualitative findings? Mention key metrics if possible.
+4.  **Main Conclusion:** What is the primary takeaway or claim of the paper?
+5.  **Mentioned Limitations:** List any limitations, weaknesses, or future work mentioned by the authors.
+
+[Note: If a section is not covered by the excerpt, write "Not covered in this excerpt."]
+
+Provide the output clearly structured under the headings above."""
+
+SYNTHESIZER_SYSTEM_PROMPT = """You are an AI assistant skilled at critically evaluating and synthesizing research paper summaries. Your goal is to produce a final, balanced digest (around 150-250 words) that incorporates the key findings and offers a brief critical perspective.
+
+You will be given extractions from consecutive excerpts of a research paper, in document order.
+
+Your Tasks:
+1.  **Synthesize:** Combine the extracted points into a coherent narrative digest summarizing the paper's core contribution.
+2.  **Critique:** Briefly assess the significance of the findings. Are the limitations acknowledged appropriately? Does the method seem sound based on the description? (Be objective).
+3.  **Format:** Produce a single block of text representing the final digest.
+
+Generate the final synthesized and critiqued digest."""
+
+# Dynamic content is substituted in last, after a static header and between stable delimiters
+USER_PROMPT_TMPL = string.Template("""${header}
+---
+${body}
+---""")
+EXTRACTOR_HEADER = "Research Paper Excerpt:"
+SYNTHESIZER_HEADER = "Excerpt Extractions:"
+# --- End Prompts ---
+
+# Shared by every bot so the prompt-cache hit rate is reported across the whole run
+prompt_cache_telemetry = CacheTelemetry()
+
+
+def _split_oversized(text: str, max_tokens: int, encoding: tiktoken.Encoding,
+                     separators: tuple[str, ...] = SPLIT_SEPARATORS) -> list[str]:
     """
-    Orchestrates the dual-chatbot digestion process.
+    Recursively splits text that exceeds max_tokens, trying coarser separators first.
+
+    Returns:
+        Pieces of text that each fit within max_tokens.
     """
-    logging.info(f"--- Starting Research Paper Digestion for: {pdf_path} ---")
+    if len(encoding.encode(text, disallowed_special=())) <= max_tokens:
+        return [text]
+    if not separators:
+        # No separator left to try; cut on raw token boundaries
+        tokens = encoding.encode(text, disallowed_special=())
+        return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+    separator, remaining = separators[0], separators[1:]
+    parts = text.split(separator)
+    if len(parts) == 1:
+        return _split_oversized(text, max_tokens, encoding, remaining)
+    # Keep each separator on the part before it so pieces still end with their "." or line break
+    parts = [part + separator for part in parts[:-1]] + [parts[-1]]
+
+    pieces = []
+    current = ""
+    for part in parts:
+        candidate = current + part
+        if len(encoding.encode(candidate, disallowed_special=())) <= max_tokens:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        if len(encoding.encode(part, disallowed_special=())) > max_tokens:
+            pieces.extend(_split_oversized(part, max_tokens, encoding, remaining))
+            current = ""
+        else:
+            current = part
+    if current:
+        pieces.append(current)
+    return [stripped for stripped in (piece.strip() for piece in pieces) if stripped]
 
-    # 1. Extract Text from PDF
-    logging.info("Step 1: Extracting text from PDF...")
-    paper_text = extract_text_from_pdf(pdf_path)
-    if not paper_text:
+
+def chunk_text(pages: list[str], max_tokens: int = CHUNK_MAX_TOKENS, model: str = LLM_MODEL,
+               standalone: Callable[[str], bool] | None = None) -> list[str]:
+    """
+    Packs consecutive pages into chunks that fit a token budget.
+
+    Pages are kept whole where possible; a page that alone exceeds the budget
+    is split recursively and its overflow spills into the following chunk.
+
+    Args:
+        pages: The text of each page, in document order.
+        max_tokens: Maximum number of tokens per chunk.
+        model: The model whose tokenizer is used for counting.
+        standalone: Returns True for pages that must not share a chunk with other pages,
+                    so that the page's chunk (and extraction) is identical in every paper.
+
+    Returns:
+        A list of chunk strings, in document order.
+    """
+    encoding = get_encoding(model)
+    chunks = []
+    current, current_tokens = [], 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        current, current_tokens = [], 0
+
+    for page in pages:
+        if not page:
+            continue
+        alone = standalone is not None and standalone(page)
+        if alone:
+            flush()
+        for piece in _split_oversized(page, max_tokens, encoding):
+            n_tokens = len(encoding.encode(piece, disallowed_special=()))
+            if current and current_tokens + n_tokens > max_tokens:
+                flush()
+            current.append(piece)
+            current_tokens += n_tokens
+        if alone:
+            flush()
+    flush()
+    return chunks
+
+
+def build_prompt(static: str, context_items: list[str]) -> str:
+    """
+    Assembles a user message from a static header and delimited context items.
+
+    Items are sorted by content digest so the same set of items always yields
+    byte-identical prompts (and cache keys), whatever order they were gathered in.
+    Items whose order carries meaning should be combined into one item first.
+
+    Args:
+        static: The fixed text that opens the message.
+        context_items: Dynamic context to include after the header.
+
+    Returns:
+        The assembled prompt.
+    """
+    ordered = sorted(context_items, key=lambda item: (content_digest(item), item))
+    return USER_PROMPT_TMPL.substitute(header=static, body="\n\n".join(ordered))
+
+
+def _extraction_prompt_for(chunk: str) -> str:
+    """Builds the extractor user message for a single chunk of paper text."""
+    return build_prompt(EXTRACTOR_HEADER, [chunk])
+
+
+def _synthesis_prompt_for(initial_extraction: str) -> str:
+    """Builds the synthesizer user message from the combined chunk extractions."""
+    return build_prompt(SYNTHESIZER_HEADER, [initial_extraction])
+
+
+def _combine_extractions(extractions: list[str | None]) -> str | None:
+    """
+    Labels and joins the per-chunk extractions in document order.
+
+    Returns:
+        The combined extraction or None if every chunk failed.
+    """
+    failed = sum(1 for extraction in extractions if not extraction)
+    if failed == len(extractions):
+        logging.error("Extractor Bot failed to produce an output. Aborting.")
+        return None
+    if failed:
+        logging.warning(f"Extractor Bot failed on {failed}/{len(extractions)} chunks; continuing with the rest.")
+    return "\n\n".join(
+        f"[Excerpt {i + 1}]\n{extraction}" for i, extraction in enumerate(extractions) if extraction
+    )
+
+
+def content_digest(text: str) -> bytes:
+    """Returns a compact BLAKE2b digest of text, used to recognize repeated pages and chunks."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _dedupe_pages(pages: list[str]) -> list[str]:
+    """Drops pages whose text repeats an earlier page of the same paper (e.g. repeated boilerplate)."""
+    seen = set()
+    unique_pages = []
+    for page in pages:
+        digest = content_digest(page)
+        if digest not in seen:
+            seen.add(digest)
+            unique_pages.append(page)
+    if len(unique_pages) < len(pages):
+        logging.info(f"Skipped {len(pages) - len(unique_pages)} duplicate pages.")
+    return unique_pages
+
+
+async def _extract_chunks(extractor_bot: Chatbot, chunks: list[str],
+                          page_cache: dict[bytes, asyncio.Task] | None = None) -> list[str | None]:
+    """
+    Runs the extractor on every chunk concurrently, reusing results for content seen before.
+
+    Args:
+        extractor_bot: The bot that performs the extraction.
+        chunks: The chunks of one paper, in document order.
+        page_cache: Extraction tasks keyed by chunk digest, shared across papers in a batch. Shared pages
+                    are chunked on their own (see _chunk_pages), so an appendix page that appears
+                    in several papers is only sent to the LLM once.
+
+    Returns:
+        The extraction for each chunk, in order (None where extraction failed).
+    """
+    async def extract(chunk: str) -> str | None:
+        try:
+            return await extractor_bot.execute_task(EXTRACTOR_SYSTEM_PROMPT, _extraction_prompt_for(chunk))
+        except ContextOverflowError as e: # Skip this chunk rather than failing the whole gather
+            logging.error(f"Chunk is too long for the extractor, skipping it: {e}")
+            return None
+
+    if page_cache is None:
+        page_cache = {}
+    tasks = []
+    for chunk in chunks:
+        digest = content_digest(chunk)
+        task = page_cache.get(digest)
+        if task is None:
+            task = asyncio.create_task(extract(chunk))
+            page_cache[digest] = task
+        else:
+            logging.info("Reusing extraction for previously seen content.")
+        tasks.append(task)
+    extractions = await asyncio.gather(*tasks)
+    for chunk, extraction in zip(chunks, extractions):
+        if not extraction:
+            page_cache.pop(content_digest(chunk), None) # Let a later paper retry failed content
+    return extractions
+
+
+async def _load_pages(pdf_path: str) -> list[str] | None:
+    """
+    Extracts the text of a PDF, one entry per page, with repeated pages removed.
+
+    Returns:
+        The pages in document order or None if no text could be extracted.
+    """
+    logging.info(f"Step 1: Extracting text from PDF ({pdf_path})...")
+    pages = await asyncio.to_thread(extract_text_from_pdf, pdf_path) # Keep the event loop free for other papers
+    if not pages or not any(pages):
         logging.error("Failed to extract text. Aborting.")
-        return
-    logging.info(f"Text extracted ({len(paper_text)} characters).")
-    if len(paper_text) > MAX_TEXT_LENGTH_WARN:
-        logging.warning(f"Extracted text is long ({len(paper_text)} chars). "
-                        f"This might exceed LLM context limits or be slow/expensive.")
-    elif len(paper_text) < 500: # Arbitrary short length check
-         logging.warning(f"Extracted text is very short ({len(paper_text)} chars). "
+        return None
+    text_length = sum(len(page) for page in pages)
+    logging.info(f"Text extracted ({len(pages)} pages, {text_length} characters).")
+    if text_length > MAX_TEXT_LENGTH_WARN:
+        logging.warning(f"Extracted text is long ({text_length} chars). "
+                        f"It will be split into many chunks, which may be slow/expensive.")
+    elif text_length < 500: # Arbitrary short length check
+         logging.warning(f"Extracted text is very short ({text_length} chars). "
                          f"Was the PDF text-based? Check extraction quality.")
+    return _dedupe_pages(pages)
+
+
+def _shared_pages(paper_pages: list[list[str] | None]) -> set[bytes]:
+    """Returns the digests of pages that appear in more than one of the papers."""
+    counts = Counter(content_digest(page) for pages in paper_pages if pages for page in pages)
+    return {digest for digest, count in counts.items() if count > 1}
 
 
-    # 2. Initialize Chatbots
+def _chunk_pages(pages: list[str], extractor_bot: Chatbot, shared_pages: set[bytes] = frozenset()) -> list[str]:
+    """
+    Splits a paper's pages into extractor-sized chunks.
+
+    Pages shared with other papers in the batch, and pages whose extraction is already
+    cached from an earlier run, get a chunk of their own so their result can be reused.
+
+    Args:
+        pages: The deduplicated pages of one paper.
+        extractor_bot: The bot whose response cache is checked for earlier page extractions.
+        shared_pages: Digests of pages that also appear in other papers (see _shared_pages).
+
+    Returns:
+        The chunks in document order.
+    """
+    def standalone(page: str) -> bool:
+        return (content_digest(page) in shared_pages
+                or extractor_bot.is_cached(EXTRACTOR_SYSTEM_PROMPT, _extraction_prompt_for(page)))
+
+    chunks = chunk_text(pages, standalone=standalone)
+    logging.info(f"Text split into {len(chunks)} chunks of at most {CHUNK_MAX_TOKENS} tokens.")
+    return chunks
+
+
+def _create_bots(use_aiohttp: bool = False) -> tuple[Chatbot, Chatbot] | None:
+    """
+    Initializes the extractor and synthesizer chatbots.
+
+    Args:
+        use_aiohttp: Send realtime calls as direct aiohttp POSTs (see Chatbot).
+
+    Returns:
+        (extractor_bot, synthesizer_bot) or None if initialization failed.
+    """
     try:
-        extractor_bot = Chatbot(model=LLM_MODEL, temperature=0.3) # More factual
-        synthesizer_bot = Chatbot(model=LLM_MODEL, temperature=0.6) # Slightly more creative/critical
+        extractor_bot = Chatbot(model=LLM_MODEL, temperature=0.3, # More factual
+                                semantic_cache=SemanticResponseCache(), # Reuse answers for paraphrased prompts
+                                use_aiohttp=use_aiohttp, telemetry=prompt_cache_telemetry)
+        synthesizer_bot = Chatbot(model=LLM_MODEL, temperature=0.6, # Slightly more creative/critical
+                                  use_aiohttp=use_aiohttp, telemetry=prompt_cache_telemetry)
     except ValueError as e:
         logging.error(f"Failed to initialize chatbots: {e}. Ensure API key is set in .env")
-        return
+        return None
     except Exception as e:
         logging.error(f"Unexpected error initializing chatbots: {e}")
+        return None
+    return extractor_bot, synthesizer_bot
+
+
+def _close_bots(bots: tuple[Chatbot, Chatbot]) -> None:
+    """Closes the caches opened by _create_bots (the shared exact-match cache stays open)."""
+    for bot in bots:
+        if bot.semantic_cache is not None:
+            bot.semantic_cache.close()
+
+
+async def run_digestion_pipeline(pdf_path: str, use_aiohttp: bool = False,
+                                 page_cache: dict[bytes, asyncio.Task] | None = None,
+                                 on_token: Callable[[str], None] | None = None,
+                                 bots: tuple[Chatbot, Chatbot] | None = None) -> str | None:
+    """
+    Orchestrates the dual-chatbot digestion process.
+
+    The paper is split into page-aligned chunks that the extractor processes
+    concurrently; the synthesizer then reduces all extractions into one digest.
+
+    Args:
+        pdf_path: The PDF file to digest.
+        use_aiohttp: Send LLM calls as direct aiohttp POSTs (see Chatbot).
+        page_cache: Extractions shared with other papers in the same batch (see _extract_chunks).
+        on_token: If given, the final digest is streamed to this callback as it is generated.
+        bots: (extractor_bot, synthesizer_bot) shared across a batch. If None, bots are
+              created for this paper and closed when it finishes.
+
+    Returns:
+        The final digest or None if any step failed.
+    """
+    logging.info(f"--- Starting Research Paper Digestion for: {pdf_path} ---")
+    owns_bots = bots is None
+    if owns_bots:
+        bots = _create_bots(use_aiohttp)
+        if not bots:
+            return
+    try:
+        # 1. Extract Text from PDF
+        pages = await _load_pages(pdf_path)
+        return await _digest_paper(pages, bots, page_cache, on_token)
+    finally:
+        if owns_bots:
+            _close_bots(bots)
+
+
+async def _digest_paper(pages: list[str] | None, bots: tuple[Chatbot, Chatbot],
+                        page_cache: dict[bytes, asyncio.Task] | None,
+                        on_token: Callable[[str], None] | None,
+                        shared_pages: set[bytes] = frozenset()) -> str | None:
+    """Digests one paper's extracted pages with the given bots (see run_digestion_pipeline)."""
+    if not pages:
         return
+    extractor_bot, synthesizer_bot = bots
+    chunks = _chunk_pages(pages, extractor_bot, shared_pages)
 
 
-    # 3. Extractor Bot Task
+    # 2. Extractor Bot Task (one concurrent call per chunk)
     logging.info("\n--- Step 2: Extractor Bot Processing ---")
-    extractor_role = "You are an AI assistant specialized in extracting key structured information from academic research papers. Focus on accuracy and conciseness."
-    extraction_prompt = f"""
-    Carefully read the following research paper text. Extract the following sections clearly and concisely:
-    1.  **Core Problem:** What specific problem or question does the paper address?
-    2.  **Proposed Method/Solution:** Briefly describe the key technique, model, or approach proposed.
-    3.  **Key Results:** What were the main quantitative or qualitative findings? Mention key metrics if possible.
-    4.  **Main Conclusion:** What is the primary takeaway or claim of the paper?
-    5.  **Mentioned Limitations:** List any limitations, weaknesses, or future work mentioned by the authors.
-
-    Research Paper Text:
-    ---
-    {paper_text[:8000]}
-    ---
-    [Note: Only the first 8000 characters of the paper text are provided above due to potential length constraints. Base your extraction on this initial part if the full text is too long for a single prompt in a real scenario, or adjust slicing as needed.]
-
-    Provide the output clearly structured under the headings above.
-    """
-    # WARNING: Sending full 'paper_text' might fail for long papers. Slicing [:8000] is a temporary measure.
-    # A robust solution needs chunking or RAG.
-    initial_extraction = extractor_bot.execute_task(extractor_role, extraction_prompt.replace("{paper_text[:8000]}", paper_text)) # Replace placeholder
-
+    extractions = await _extract_chunks(extractor_bot, chunks, page_cache)
+    initial_extraction = _combine_extractions(extractions)
     if not initial_extraction:
-        logging.error("Extractor Bot failed to produce an output. Aborting.")
         return
     print("\n--- Extractor Bot Output ---")
     print(initial_extraction)
 
 
-    # 4. Synthesizer/Critic Bot Task
+    # 3. Synthesizer/Critic Bot Task
     logging.info("\n--- Step 3: Synthesizer/Critic Bot Processing ---")
-    synthesizer_role = "You are an AI assistant skilled at critically evaluating and synthesizing research paper summaries. Your goal is to produce a final, balanced digest (around 150-250 words) that incorporates the key findings and offers a brief critical perspective."
-    synthesis_prompt = f"""
-    You have been provided with an initial extraction from a research paper. Review this extraction in the context of the full paper text (provided again below for reference).
-
-    Your Tasks:
-    1.  **Synthesize:** Combine the extracted points into a coherent narrative digest summarizing the paper's core contribution.
-    2.  **Critique:** Briefly assess the significance of the findings. Are the limitations acknowledged appropriately? Does the method seem sound based on the description? (Be objective).
-    3.  **Format:** Produce a single block of text representing the final digest.
-
-    Initial Extraction:
-    ---
-    {initial_extraction}
-    ---
-
-    Full Paper Text (for context - may be truncated):
-    ---
-    {paper_text[:8000]}
-    ---
-    [Note: Full paper text context provided again, potentially truncated.]
-
-    Generate the final synthesized and critiqued digest.
-    """
-    # WARNING: Again, sending full 'paper_text' is risky for long papers.
-    final_digest = synthesizer_bot.execute_task(synthesizer_role, synthesis_prompt.replace("{paper_text[:8000]}", paper_text)) # Replace placeholder
+    if on_token:
+        print("\n--- Final Synthesized Digest ---")
+    try:
+        final_digest = await synthesizer_bot.execute_task(SYNTHESIZER_SYSTEM_PROMPT,
+                                                          _synthesis_prompt_for(initial_extraction),
+                                                          on_token=on_token)
+    except ContextOverflowError as e:
+        logging.error(f"Combined extractions are too long for the synthesizer: {e}. "
+                      f"Try a model with a larger context window.")
+        return
 
     if not final_digest:
         logging.error("Synthesizer Bot failed to produce an output.")
         print("\n--- Final Digest: FAILED ---")
         return
 
-    print("\n--- Final Synthesized Digest ---")
-    print(final_digest)
+    if on_token:
+        print() # End the streamed line
+    else:
+        print("\n--- Final Synthesized Digest ---")
+        print(final_digest)
     logging.info("--- Digestion Pipeline Completed ---")
+    return final_digest
+
+
+async def _run_offline_batch(pdf_paths: list[str]) -> list[str | None]:
+    """
+    Digests papers through the OpenAI Batch API: one batch for all extractions, then one for all syntheses.
+
+    Returns:
+        The final digest for each path, in order (None where digestion failed).
+    """
+    digests = [None] * len(pdf_paths)
+    paper_pages = await asyncio.gather(*[_load_pages(p) for p in pdf_paths])
+    bots = _create_bots()
+    if not bots:
+        return digests
+    try:
+        return await _digest_offline(pdf_paths, paper_pages, bots)
+    finally:
+        _close_bots(bots)
+
+
+async def _digest_offline(pdf_paths: list[str], paper_pages: list[list[str] | None],
+                          bots: tuple[Chatbot, Chatbot]) -> list[str | None]:
+    """Runs both Batch API stages for papers whose pages are already extracted (see _run_offline_batch)."""
+    digests = [None] * len(pdf_paths)
+    extractor_bot, synthesizer_bot = bots
+    shared_pages = _shared_pages(paper_pages)
+    paper_chunks = [_chunk_pages(pages, extractor_bot, shared_pages) if pages else None for pages in paper_pages]
+
+    logging.info("\n--- Step 2: Extractor Bot Batch ---")
+    # Keyed by content digest so identical chunks across papers are extracted once
+    unique_chunks = {
+        content_digest(chunk).hex(): chunk
+        for chunks in paper_chunks if chunks
+        for chunk in chunks
+    }
+    extraction_requests = [
+        {"custom_id": digest, "system_prompt": EXTRACTOR_SYSTEM_PROMPT, "user_prompt": _extraction_prompt_for(chunk)}
+        for digest, chunk in unique_chunks.items()
+    ]
+    if not extraction_requests:
+        logging.error("No text could be extracted from any paper. Aborting.")
+        return digests
+    extraction_results = await extractor_bot.run_batch(extraction_requests)
+    if extraction_results is None:
+        return digests
+
+    logging.info("\n--- Step 3: Synthesizer/Critic Bot Batch ---")
+    synthesis_requests = []
+    for paper, chunks in enumerate(paper_chunks):
+        if not chunks:
+            continue
+        initial_extraction = _combine_extractions(
+            [extraction_results.get(content_digest(chunk).hex()) for chunk in chunks]
+        )
+        if initial_extraction:
+            synthesis_requests.append({"custom_id": str(paper), "system_prompt": SYNTHESIZER_SYSTEM_PROMPT,
+                                       "user_prompt": _synthesis_prompt_for(initial_extraction)})
+    if not synthesis_requests:
+        return digests
+    synthesis_results = await synthesizer_bot.run_batch(synthesis_requests)
+    if synthesis_results is None:
+        return digests
+
+    for paper, pdf_path in enumerate(pdf_paths):
+        digests[paper] = synthesis_results.get(str(paper))
+        print(f"\n--- Final Synthesized Digest: {pdf_path} ---")
+        print(digests[paper] or "FAILED")
+    logging.info("--- Batch Digestion Completed ---")
+    return digests
+
+
+async def run_digestion_pipeline_batch(pdf_paths: list[str], batch: bool = False) -> list[str | None]:
+    """
+    Digests several papers.
+
+    Args:
+        pdf_paths: The PDF files to digest.
+        batch: If True, submit all calls through the OpenAI Batch API (~50% cheaper,
+               results within 24h) instead of concurrent realtime calls.
+
+    Returns:
+        The final digest for each path, in order (None where digestion failed).
+    """
+    logging.info(f"--- Starting batch digestion of {len(pdf_paths)} papers ---")
+    if batch:
+        return await _run_offline_batch(pdf_paths)
+    # Many papers in flight at once is where the SDK's httpx layer bottlenecks, so go direct
+    bots = _create_bots(use_aiohttp=True) # One set of bots and caches for the whole batch
+    if not bots:
+        return [None] * len(pdf_paths)
+    try:
+        # Load every paper first so pages shared between papers can be chunked (and extracted) once
+        paper_pages = await asyncio.gather(*[_load_pages(p) for p in pdf_paths])
+        shared_pages = _shared_pages(paper_pages)
+        if shared_pages:
+            logging.info(f"{len(shared_pages)} pages appear in more than one paper.")
+        page_cache = {}
+        return await asyncio.gather(*[_digest_paper(pages, bots, page_cache, None, shared_pages)
+                                      for pages in paper_pages])
+    finally:
+        _close_bots(bots)
+
+
+async def _main(pdf_path: str):
+    """Runs the pipeline and releases the shared HTTP connection pool afterwards."""
+    try:
+        await run_digestion_pipeline(pdf_path, on_token=lambda token: print(token, end="", flush=True))
+        logging.info(f"Prompt cache telemetry: {prompt_cache_telemetry.summary()}")
+    finally:
+        await close_shared_http_client()
 
 
 if __name__ == "__main__":
@@ -121,4 +543,4 @@ if __name__ == "__main__":
          print(f"Error: PDF file not found at '{PDF_PATH}'.")
          print("Please check the 'PDF_PATH' variable in 'main_digester.py'.")
     else:
-        run_digestion_pipeline(PDF_PATH)
\ No newline at end of file
+        asyncio.run(_main(PDF_PATH))
\ No newline at end of file
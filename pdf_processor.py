@@ -1,24 +1,116 @@
 # pdf_processor.py
 import fitz  # PyMuPDF
 import logging
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def extract_text_from_pdf(pdf_path: str) -> str | None:
-    """Extracts text content from a PDF file."""
+_SPACE_RE = re.compile(r'[^\S\n]+') # Whitespace other than line breaks
+_LINE_EDGE_RE = re.compile(r' ?\n ?')
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+PARALLEL_MIN_PAGES = 64 # Below this, worker process start-up costs more than it saves
+
+# One pool for every extraction in the process, so papers extracted concurrently queue for
+# the same os.cpu_count() workers instead of each spawning its own set
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+@contextmanager
+def _open_pdf(pdf_path: str) -> Iterator[fitz.Document]:
+    """
+    Opens a PDF from a read-only memory map of the file.
+
+    The OS pages the file in lazily as PyMuPDF reads it, and repeated opens of
+    the same path (e.g. by parallel workers) share the kernel page cache.
+    """
+    with open(pdf_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) # Stays valid after the file is closed
+    view = memoryview(mm)
     try:
-        logging.info(f"Opening PDF: {pdf_path}")
-        doc = fitz.open(pdf_path)
-        text = ""
+        try:
+            doc = fitz.open(stream=view, filetype="pdf")
+        except TypeError: # Older PyMuPDF releases only accept bytes streams
+            doc = fitz.open(pdf_path)
+        with doc:
+            yield doc
+    finally:
+        try:
+            view.release()
+            mm.close()
+        except BufferError: # PyMuPDF still holds the buffer; the mapping is freed when it lets go
+            pass
+
+def _clean_page_text(text: str) -> str:
+    """Collapses runs of spaces and blank lines, keeping the line and paragraph breaks chunking splits on."""
+    text = _LINE_EDGE_RE.sub('\n', _SPACE_RE.sub(' ', text))
+    return _BLANK_LINES_RE.sub('\n\n', text).strip()
+
+def iter_pdf_pages(pdf_path: str) -> Iterator[str]:
+    """
+    Yields the cleaned text of each page of a PDF file, in order.
+
+    Only one page's text is held at a time, so callers that process pages
+    incrementally never materialize the whole document in memory.
+    """
+    with _open_pdf(pdf_path) as doc:
         logging.info(f"Extracting text from {len(doc)} pages...")
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text += page.get_text()
-        doc.close()
-        logging.info(f"Successfully extracted {len(text)} characters.")
-        # Basic cleaning (optional, can be more sophisticated)
-        text = ' '.join(text.split()) # Remove excessive whitespace
-        return text
+        for page in doc:
+            # Basic cleaning (optional, can be more sophisticated)
+            yield _clean_page_text(page.get_text()) # Remove excessive whitespace
+
+def _clean_page_range(pdf_path: str, start: int, stop: int) -> list[str]:
+    """Extracts and cleans pages [start, stop) using a document opened in this worker process."""
+    with _open_pdf(pdf_path) as doc:
+        return [_clean_page_text(doc[i].get_text()) for i in range(start, stop)]
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    """Returns the shared worker pool for page extraction, starting it on first use."""
+    global _page_pool
+    with _page_pool_lock: # extract_text_from_pdf is called from several threads at once
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return _page_pool
+
+def _extract_pages_parallel(pdf_path: str, page_count: int, workers: int) -> list[str]:
+    """Splits the page range across worker processes and reassembles the pages in order."""
+    global _page_pool
+    # PyMuPDF is not thread-safe, so each worker is a separate process with its own Document
+    step = -(-page_count // workers) # Ceiling division
+    starts = range(0, page_count, step)
+    stops = [min(start + step, page_count) for start in starts]
+    logging.info(f"Extracting text from {page_count} pages in {len(starts)} ranges...")
+    pool = _get_page_pool()
+    try:
+        ranges = list(pool.map(_clean_page_range, [pdf_path] * len(starts), starts, stops))
+    except BrokenProcessPool:
+        with _page_pool_lock: # A worker died; let the next extraction start a fresh pool
+            if _page_pool is pool:
+                _page_pool = None
+        raise
+    return [page for page_range in ranges for page in page_range]
+
+def extract_text_from_pdf(pdf_path: str) -> list[str] | None:
+    """Extracts the text content of a PDF file, one string per page."""
+    try:
+        logging.info(f"Opening PDF: {pdf_path}")
+        with _open_pdf(pdf_path) as doc:
+            page_count = len(doc)
+        workers = min(os.cpu_count() or 1, page_count // PARALLEL_MIN_PAGES)
+        if workers > 1:
+            pages = _extract_pages_parallel(pdf_path, page_count, workers)
+        else:
+            pages = list(iter_pdf_pages(pdf_path))
+        logging.info(f"Successfully extracted {sum(len(p) for p in pages)} characters.")
+        return pages
     except Exception as e:
         logging.error(f"Error processing PDF {pdf_path}: {e}")
         return None
@@ -29,9 +121,10 @@ if __name__ == '__main__':
     if pdf_file == "example_paper.pdf":
          print("Please replace 'example_paper.pdf' with the actual path to your PDF file.")
     else:
-        extracted_text = extract_text_from_pdf(pdf_file)
-        if extracted_text:
-            print(f"Extracted text (first 500 chars):\n{extracted_text[:500]}...")
-            print(f"\nTotal characters extracted: {len(extracted_text)}")
+        extracted_pages = extract_text_from_pdf(pdf_file)
+        if extracted_pages:
+            print(f"Extracted text of page 1 (first 500 chars):\n{extracted_pages[0][:500]}...")
+            print(f"\nTotal pages extracted: {len(extracted_pages)}")
+            print(f"Total characters extracted: {sum(len(p) for p in extracted_pages)}")
         else:
             print("Failed to extract text from PDF.")
\ No newline at end of file
@@ -0,0 +1,201 @@
+# response_cache.py
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_CACHE_PATH = ".llm_cache.sqlite"
+DEFAULT_MEMORY_SIZE = 256 # Entries kept in process in front of the database
+DEFAULT_SEMANTIC_CACHE_PATH = ".llm_semantic_cache.sqlite"
+DEFAULT_SIMILARITY_THRESHOLD = 0.97
+DEFAULT_SEMANTIC_MAX_ENTRIES = 5000 # Per namespace; bounds memory and the cost of each lookup
+
+
+def make_cache_key(model: str, temperature: float, system_prompt: str, user_prompt: str) -> str:
+    """Builds the exact-match cache key for a single LLM call."""
+    raw = f"{model}|{temperature}|{system_prompt}|{user_prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """A persistent exact-match cache of LLM responses backed by SQLite, with an in-process LRU in front."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, memory_size: int = DEFAULT_MEMORY_SIZE):
+        """
+        Initializes the ResponseCache.
+
+        Args:
+            path: The SQLite database file. Use ":memory:" for a throwaway cache.
+            memory_size: How many recently used entries to serve without touching the database (0 disables).
+        """
+        self.path = path
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self.closed = False
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, content TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        logging.info(f"Response cache opened at: {self.path}")
+
+    def _remember(self, key: str, content: str) -> None:
+        """Adds an entry to the in-process LRU, evicting the least recently used one if full."""
+        if self.memory_size <= 0:
+            return
+        self._memory[key] = content
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached content for key, or None on a miss."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        row = self._conn.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        self._remember(key, row[0])
+        return row[0]
+
+    def set(self, key: str, content: str) -> None:
+        """Stores content under key, replacing any previous entry."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, content) VALUES (?, ?)", (key, content)
+        )
+        self._conn.commit()
+        self._remember(key, content)
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        self._conn.close()
+        self.closed = True
+
+
+_default_cache = None
+
+
+def get_default_cache() -> ResponseCache:
+    """
+    Returns the process-wide ResponseCache at DEFAULT_CACHE_PATH, opening it on first use.
+
+    Every bot built without an explicit cache shares this instance, so its in-process
+    LRU stays warm across bots, pipelines and papers instead of starting empty each time.
+    """
+    global _default_cache
+    if _default_cache is None or _default_cache.closed:
+        _default_cache = ResponseCache()
+    return _default_cache
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scales each row to unit length so a dot product is the cosine similarity."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class _NamespaceIndex:
+    """The in-memory embeddings of one namespace: row ids, unit-length vectors and contents, oldest first."""
+
+    def __init__(self, rowids: list[int], matrix: np.ndarray, contents: list[str]):
+        self.rowids = rowids
+        self.matrix = matrix
+        self.contents = contents
+
+
+class SemanticResponseCache:
+    """A persistent cache that matches LLM responses by prompt embedding similarity."""
+
+    def __init__(self, path: str = DEFAULT_SEMANTIC_CACHE_PATH, threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                 max_entries: int = DEFAULT_SEMANTIC_MAX_ENTRIES):
+        """
+        Initializes the SemanticResponseCache.
+
+        Args:
+            path: The SQLite database file. Use ":memory:" for a throwaway cache.
+            threshold: Minimum cosine similarity (0.0 to 1.0) for a cached entry to count as a hit.
+            max_entries: Entries kept per namespace; the oldest are evicted beyond this.
+        """
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._indexes = {}
+        self._lock = threading.Lock() # get/set run in worker threads (see Chatbot._call_llm)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "namespace TEXT NOT NULL, embedding BLOB NOT NULL, content TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_namespace ON responses (namespace)")
+        self._conn.commit()
+        logging.info(f"Semantic response cache opened at: {self.path}")
+
+    def _index(self, namespace: str) -> _NamespaceIndex:
+        """Returns the in-memory index of namespace, loading it from the database on first use."""
+        index = self._indexes.get(namespace)
+        if index is None:
+            rows = self._conn.execute(
+                "SELECT rowid, embedding, content FROM responses WHERE namespace = ? ORDER BY rowid", (namespace,)
+            ).fetchall()
+            vectors = [np.frombuffer(blob, dtype=np.float32) for _, blob, _ in rows]
+            matrix = _normalize(np.vstack(vectors)) if vectors else np.empty((0, 0), dtype=np.float32)
+            index = _NamespaceIndex([row[0] for row in rows], matrix, [row[2] for row in rows])
+            self._indexes[namespace] = index
+            self._evict(index)
+        return index
+
+    def _evict(self, index: _NamespaceIndex) -> None:
+        """Drops the oldest entries of a namespace beyond max_entries, in memory and on disk."""
+        excess = len(index.rowids) - self.max_entries
+        if excess <= 0:
+            return
+        self._conn.executemany("DELETE FROM responses WHERE rowid = ?", [(rowid,) for rowid in index.rowids[:excess]])
+        self._conn.commit()
+        index.rowids, index.matrix, index.contents = index.rowids[excess:], index.matrix[excess:], index.contents[excess:]
+
+    def get(self, namespace: str, embedding: list[float]) -> str | None:
+        """
+        Returns the content of the most similar entry in namespace, or None on a miss.
+
+        Args:
+            namespace: Scopes the lookup (e.g., a hash of model, temperature and system prompt).
+            embedding: The embedding of the user prompt being looked up.
+        """
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        with self._lock:
+            index = self._index(namespace)
+            if not index.rowids or index.matrix.shape[1] != query.shape[0]:
+                return None
+            scores = index.matrix @ query
+            best = int(np.argmax(scores))
+            best_score, best_content = float(scores[best]), index.contents[best]
+        if best_score >= self.threshold:
+            logging.info(f"Semantic cache hit (similarity {best_score:.3f}).")
+            return best_content
+        return None
+
+    def set(self, namespace: str, embedding: list[float], content: str) -> None:
+        """Stores content alongside the embedding of the prompt that produced it."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            index = self._index(namespace)
+            cursor = self._conn.execute(
+                "INSERT INTO responses (namespace, embedding, content) VALUES (?, ?, ?)",
+                (namespace, vector.tobytes(), content),
+            )
+            self._conn.commit()
+            row = _normalize(vector)[np.newaxis, :]
+            index.matrix = np.vstack([index.matrix, row]) if index.rowids else row
+            index.rowids.append(cursor.lastrowid)
+            index.contents.append(content)
+            self._evict(index)
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()